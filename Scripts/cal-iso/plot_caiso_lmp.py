@@ -7,14 +7,27 @@ Examples:
   ./plot_caiso_lmp.py data.csv --node 0096WD_7_N001
   ./plot_caiso_lmp.py data.csv --node 0096WD_7_N001,ABC123 --resample 15min
   ./plot_caiso_lmp.py data.csv --market DAM --aggregate mean --resample 1H
+  ./plot_caiso_lmp.py data.csv --engine duckdb --resample 15min --save out.png
   ./plot_caiso_lmp.py data.csv --chunksize 10000 --simplify-threshold 0.5 --save out.png
 """
 
 import argparse
+import numpy as np
 import pandas as pd
+from pandas.api.types import union_categoricals
 import matplotlib as mpl
-import matplotlib.pyplot as plt
-from typing import List, Optional
+from typing import List, Optional, Tuple
+
+# Expected columns; only LOAD_COLS are actually read
+REQUIRED_COLS = {
+    "INTERVALSTARTTIME_GMT", "INTERVALENDTIME_GMT", "MARKET_RUN_ID",
+    "LMP_TYPE", "NODE_ID", "MW"
+}
+LOAD_COLS = ["INTERVALSTARTTIME_GMT", "MARKET_RUN_ID", "LMP_TYPE", "NODE_ID", "MW"]
+LOAD_DTYPES = {
+    "NODE_ID": "category", "MARKET_RUN_ID": "category",
+    "LMP_TYPE": "category", "MW": "float32",
+}
 
 def parse_args():
     p = argparse.ArgumentParser(description="Plot CAISO LMP CSV with filtering and safe large-plot handling.")
@@ -24,6 +37,11 @@ def parse_args():
     p.add_argument("--lmp-type", help="Filter by LMP_TYPE (e.g., LMP, MCC, MLC).")
     p.add_argument("--start", help="Start datetime ISO (e.g., 2025-10-01T00:00).")
     p.add_argument("--end", help="End datetime ISO (e.g., 2025-10-02T00:00).")
+    p.add_argument("--engine", choices=["pandas","pyarrow","duckdb"], default="pandas",
+                   help="pyarrow: parse and filter the CSV with PyArrow; duckdb: also "
+                        "aggregate and resample in DuckDB. Both must be installed.")
+    p.add_argument("--read-chunksize", type=int, default=500_000,
+                   help="CSV rows read per chunk; filters are applied per chunk.")
 
     # Rendering controls
     p.add_argument("--aggregate", choices=["none","mean","median"], default="mean",
@@ -36,6 +54,8 @@ def parse_args():
                    help="matplotlib Agg path chunk size to avoid overflow (0 disables).")
     p.add_argument("--simplify-threshold", type=float, default=0.5,
                    help="Path simplify threshold (higher = more aggressive).")
+    p.add_argument("--target-points", type=int, default=4000,
+                   help="Downsample each plotted series to this many points with LTTB (0 disables).")
     p.add_argument("--title", help="Custom plot title.")
     p.add_argument("--save", help="Path to save image (e.g. plot.png). If omitted, shows window.")
     return p.parse_args()
@@ -45,49 +65,128 @@ def maybe_split_nodes(node_arg: Optional[str]) -> Optional[List[str]]:
         return None
     return [x.strip() for x in node_arg.split(",") if x.strip()]
 
-def main():
-    args = parse_args()
+def to_utc(value: str) -> pd.Timestamp:
+    """Parse a --start/--end value; naive times are taken as GMT like the CSV."""
+    ts = pd.Timestamp(value)
+    return ts.tz_localize("UTC") if ts.tzinfo is None else ts.tz_convert("UTC")
 
-    # Safer defaults for large paths
-    if args.chunksize is not None:
-        mpl.rcParams["agg.path.chunksize"] = int(args.chunksize)  # e.g., 20000
-    mpl.rcParams["path.simplify"] = True
-    mpl.rcParams["path.simplify_threshold"] = float(args.simplify_threshold)
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of n_out points that keep the shape of (x, y)."""
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = x.astype(np.float64)
+    y = y.astype(np.float64)
 
-    # Load
-    df = pd.read_csv(args.csv)
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    edges = np.append(edges, n)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
 
-    # Expected columns exist?
-    required_cols = {
-        "INTERVALSTARTTIME_GMT", "INTERVALENDTIME_GMT", "MARKET_RUN_ID",
-        "LMP_TYPE", "NODE_ID", "MW"
-    }
-    missing = required_cols - set(df.columns)
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Third vertex: the average of the next bucket (or the last point)
+        avg_x = x[hi:edges[i + 2]].mean()
+        avg_y = y[hi:edges[i + 2]].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+def check_columns(path: str) -> None:
+    """Exit with an error if the CSV header lacks any of REQUIRED_COLS."""
+    header = pd.read_csv(path, nrows=0).columns
+    missing = REQUIRED_COLS - set(header)
     if missing:
         raise SystemExit(f"Missing columns in CSV: {', '.join(sorted(missing))}")
 
-    # Parse times
-    df["ts"] = pd.to_datetime(df["INTERVALSTARTTIME_GMT"], errors="coerce")
-    df = df.dropna(subset=["ts"])
+def load_lmp(args, nodes: Optional[List[str]]) -> pd.DataFrame:
+    """Read the CSV in chunks, keeping only the filtered ts/NODE_ID/MW rows."""
+    check_columns(args.csv)
 
-    # Filters
-    nodes = maybe_split_nodes(args.node)
+    wanted_nodes = set(nodes) if nodes else None
+    market = args.market.upper() if args.market else None
+    lmp_type = args.lmp_type.upper() if args.lmp_type else None
+    start = to_utc(args.start) if args.start else None
+    end = to_utc(args.end) if args.end else None
+
+    reader = pd.read_csv(args.csv, usecols=LOAD_COLS, dtype=LOAD_DTYPES,
+                         chunksize=args.read_chunksize)
+    parts = []
+    for chunk in reader:
+        if wanted_nodes:
+            chunk = chunk[chunk["NODE_ID"].isin(wanted_nodes)]
+        if market:
+            chunk = chunk[chunk["MARKET_RUN_ID"].str.upper() == market]
+        if lmp_type:
+            chunk = chunk[chunk["LMP_TYPE"].str.upper() == lmp_type]
+
+        # Parse times (CAISO timestamps are ISO-8601 with a UTC offset, e.g.
+        # 2025-10-01T07:00:00-00:00; an explicit format avoids per-row inference)
+        ts = pd.to_datetime(chunk["INTERVALSTARTTIME_GMT"], format="ISO8601",
+                            utc=True, errors="coerce", cache=True)
+        chunk = chunk[["NODE_ID", "MW"]].assign(ts=ts).dropna(subset=["ts"])
+        if start is not None:
+            chunk = chunk[chunk["ts"] >= start]
+        if end is not None:
+            chunk = chunk[chunk["ts"] <= end]
+        parts.append(chunk)
+
+    # Each chunk infers its own NODE_ID categories, and concat falls back to
+    # plain strings when they differ (files are usually grouped by node)
+    df = pd.concat(parts, ignore_index=True)
+    df["NODE_ID"] = union_categoricals([part["NODE_ID"] for part in parts])
+    return df
+
+def load_lmp_arrow(args, nodes: Optional[List[str]]) -> pd.DataFrame:
+    """Same as load_lmp, but the CSV is parsed and filtered by PyArrow (multithreaded)."""
+    try:
+        import pyarrow as pa
+        import pyarrow.compute as pc
+        import pyarrow.csv as pacsv
+    except ImportError:
+        raise SystemExit("--engine pyarrow requires the pyarrow package (pip install pyarrow).")
+
+    check_columns(args.csv)
+    table = pacsv.read_csv(args.csv, convert_options=pacsv.ConvertOptions(
+        include_columns=LOAD_COLS,
+        column_types={
+            "INTERVALSTARTTIME_GMT": pa.string(), "MARKET_RUN_ID": pa.string(),
+            "LMP_TYPE": pa.string(), "NODE_ID": pa.dictionary(pa.int32(), pa.string()),
+            "MW": pa.float32(),
+        },
+    ))
+
+    # Unparseable timestamps become null, like errors="coerce"
+    ts = pc.strptime(table["INTERVALSTARTTIME_GMT"], format="%Y-%m-%dT%H:%M:%S%z",
+                     unit="s", error_is_null=True)
+    mask = pc.is_valid(ts)
     if nodes:
-        df = df[df["NODE_ID"].isin(nodes)]
+        mask = pc.and_(mask, pc.is_in(table["NODE_ID"], value_set=pa.array(nodes)))
     if args.market:
-        df = df[df["MARKET_RUN_ID"].str.upper() == args.market.upper()]
+        mask = pc.and_(mask, pc.equal(pc.utf8_upper(table["MARKET_RUN_ID"]), args.market.upper()))
     if args.lmp_type:
-        df = df[df["LMP_TYPE"].str.upper() == args.lmp_type.upper()]
+        mask = pc.and_(mask, pc.equal(pc.utf8_upper(table["LMP_TYPE"]), args.lmp_type.upper()))
     if args.start:
-        df = df[df["ts"] >= pd.to_datetime(args.start)]
+        mask = pc.and_(mask, pc.greater_equal(ts, pa.scalar(to_utc(args.start), type=ts.type)))
     if args.end:
-        df = df[df["ts"] <= pd.to_datetime(args.end)]
+        mask = pc.and_(mask, pc.less_equal(ts, pa.scalar(to_utc(args.end), type=ts.type)))
+
+    table = pa.table({"NODE_ID": table["NODE_ID"], "MW": table["MW"], "ts": ts}).filter(mask)
+    return table.to_pandas()
+
+def pandas_series(args, nodes: Optional[List[str]]) -> Tuple[List[Tuple[Optional[str], pd.DataFrame]], str]:
+    """Load, filter and aggregate with pandas; returns ([(label, ts/MW frame)], legend label)."""
+    df = load_lmp_arrow(args, nodes) if args.engine == "pyarrow" else load_lmp(args, nodes)
 
     if df.empty:
         raise SystemExit("No data after filtering. Check filters or input file.")
 
-    # Sort by time before plotting
-    df = df.sort_values("ts")
+    # Sort by time before plotting (CAISO exports are usually already in order)
+    if not df["ts"].is_monotonic_increasing:
+        df = df.sort_values("ts", kind="mergesort", ignore_index=True)
 
     # Resample helper (works after setting index)
     def apply_resample(frame: pd.DataFrame) -> pd.DataFrame:
@@ -102,40 +201,140 @@ def main():
                  .reset_index()
         )
 
-    plt.figure(figsize=(12, 6))
-
     # If user specified nodes, plot each separately
     if nodes:
-        for nid, g in df.groupby("NODE_ID", sort=False):
-            g = g[["ts","MW"]]
-            g = apply_resample(g) if args.resample else g
-            if args.scatter:
-                plt.scatter(g["ts"], g["MW"], s=6, alpha=0.7, label=nid)
-            else:
-                plt.plot(g["ts"], g["MW"], marker=None, linestyle="-", label=nid)
-        legend_label = "Selected nodes"
-    else:
-        # No explicit nodes. If there are multiple nodes present, aggregate per timestamp
-        n_nodes = df["NODE_ID"].nunique()
-        if n_nodes > 1 and args.aggregate != "none":
-            # Aggregate across nodes at each timestamp
-            agg_fn = {"mean": "mean", "median": "median"}[args.aggregate]
-            agg_series = df.groupby("ts")["MW"].agg(agg_fn).reset_index()
-            agg_series = apply_resample(agg_series) if args.resample else agg_series
-            if args.scatter:
-                plt.scatter(agg_series["ts"], agg_series["MW"], s=6, alpha=0.7)
-            else:
-                plt.plot(agg_series["ts"], agg_series["MW"], marker=None, linestyle="-")
-            legend_label = f"{args.aggregate.title()} across {n_nodes} nodes"
+        lines = [(nid, apply_resample(g[["ts","MW"]]))
+                 for nid, g in df.groupby("NODE_ID", sort=False, observed=True)]
+        return lines, "Selected nodes"
+
+    # No explicit nodes. If there are multiple nodes present, aggregate per timestamp
+    n_nodes = df["NODE_ID"].nunique()
+    if n_nodes > 1 and args.aggregate != "none":
+        # Aggregate across nodes at each timestamp
+        agg_fn = {"mean": "mean", "median": "median"}[args.aggregate]
+        agg_series = df.groupby("ts")["MW"].agg(agg_fn).reset_index()
+        return [(None, apply_resample(agg_series))], f"{args.aggregate.title()} across {n_nodes} nodes"
+
+    # Single node in data (or user chose aggregate=none) — plot raw (or resampled) series
+    return [(None, apply_resample(df[["ts","MW"]]))], "Series"
+
+def duckdb_series(args, nodes: Optional[List[str]]) -> Tuple[List[Tuple[Optional[str], pd.DataFrame]], str]:
+    """Same as pandas_series, but filtering, aggregation and resampling run in DuckDB."""
+    try:
+        import duckdb
+    except ImportError:
+        raise SystemExit("--engine duckdb requires the duckdb package (pip install duckdb).")
+
+    micros = None
+    if args.resample:
+        try:
+            micros = pd.tseries.frequencies.to_offset(args.resample).nanos // 1000
+        except ValueError:
+            raise SystemExit(f"--engine duckdb needs a fixed-width --resample (got {args.resample!r}).")
+
+    con = duckdb.connect()
+    missing = REQUIRED_COLS - {row[0] for row in con.execute(
+        "DESCRIBE SELECT * FROM read_csv_auto(?, all_varchar = true)", [args.csv]).fetchall()}
+    if missing:
+        raise SystemExit(f"Missing columns in CSV: {', '.join(sorted(missing))}")
+
+    where, params = ["ts IS NOT NULL"], [args.csv]
+    if nodes:
+        where.append(f"NODE_ID IN ({', '.join('?' * len(nodes))})")
+        params.extend(nodes)
+    if args.market:
+        where.append("upper(MARKET_RUN_ID) = ?")
+        params.append(args.market.upper())
+    if args.lmp_type:
+        where.append("upper(LMP_TYPE) = ?")
+        params.append(args.lmp_type.upper())
+    if args.start:
+        where.append("ts >= ?")
+        params.append(to_utc(args.start).tz_localize(None).to_pydatetime())
+    if args.end:
+        where.append("ts <= ?")
+        params.append(to_utc(args.end).tz_localize(None).to_pydatetime())
+
+    # epoch_us/make_timestamp turn the offset-qualified string into naive UTC
+    # without depending on the session time zone
+    con.execute(f"""
+        CREATE TEMP TABLE lmp AS
+        SELECT ts, NODE_ID, MW FROM (
+            SELECT make_timestamp(epoch_us(TRY_CAST(INTERVALSTARTTIME_GMT AS TIMESTAMPTZ))) AS ts,
+                   NODE_ID, TRY_CAST(MW AS FLOAT) AS MW,
+                   MARKET_RUN_ID, LMP_TYPE
+            FROM read_csv_auto(?, all_varchar = true)
+        )
+        WHERE {' AND '.join(where)}
+    """, params)
+
+    n_nodes = con.execute("SELECT count(DISTINCT NODE_ID) FROM lmp").fetchone()[0]
+    if n_nodes == 0:
+        raise SystemExit("No data after filtering. Check filters or input file.")
+
+    bucket = "ts"
+    if micros is not None:
+        # Buckets start at midnight of the first day, like pandas resample
+        # (origin="start_day"); DuckDB's default origin is 2000-01-03
+        origin = con.execute("SELECT date_trunc('day', min(ts)) FROM lmp").fetchone()[0]
+        bucket = f"time_bucket(INTERVAL '{micros} microseconds', ts, TIMESTAMP '{origin}')"
+
+    def fetch(query: str) -> pd.DataFrame:
+        frame = con.execute(query).df()
+        frame["ts"] = frame["ts"].dt.tz_localize("UTC")
+        frame["MW"] = frame["MW"].astype("float32")
+        return frame
+
+    if nodes:
+        frame = fetch(f"""
+            SELECT NODE_ID, {bucket} AS ts, avg(MW) AS MW FROM lmp
+            GROUP BY ALL ORDER BY ts
+        """ if args.resample else "SELECT NODE_ID, ts, MW FROM lmp ORDER BY ts")
+        lines = [(nid, g[["ts","MW"]]) for nid, g in frame.groupby("NODE_ID", sort=False)]
+        return lines, "Selected nodes"
+
+    if n_nodes > 1 and args.aggregate != "none":
+        agg_fn = {"mean": "avg", "median": "median"}[args.aggregate]
+        frame = fetch(f"""
+            SELECT {bucket} AS ts, avg(MW) AS MW
+            FROM (SELECT ts, {agg_fn}(MW) AS MW FROM lmp GROUP BY ts)
+            GROUP BY ALL ORDER BY ts
+        """)
+        return [(None, frame)], f"{args.aggregate.title()} across {n_nodes} nodes"
+
+    frame = fetch(f"SELECT {bucket} AS ts, avg(MW) AS MW FROM lmp GROUP BY ALL ORDER BY ts"
+                  if args.resample else "SELECT ts, MW FROM lmp ORDER BY ts")
+    return [(None, frame)], "Series"
+
+def main():
+    args = parse_args()
+
+    # Safer defaults for large paths
+    if args.chunksize is not None:
+        mpl.rcParams["agg.path.chunksize"] = int(args.chunksize)  # e.g., 20000
+    mpl.rcParams["path.simplify"] = True
+    mpl.rcParams["path.simplify_threshold"] = float(args.simplify_threshold)
+
+    # Saving needs no GUI, so skip backend probing (and toolkit imports) entirely
+    if args.save:
+        mpl.use("Agg")
+        mpl.rcParams["svg.fonttype"] = "none"
+    import matplotlib.pyplot as plt
+
+    nodes = maybe_split_nodes(args.node)
+    load_series = duckdb_series if args.engine == "duckdb" else pandas_series
+    lines, legend_label = load_series(args, nodes)
+
+    plt.figure(figsize=(12, 6))
+    for label, series in lines:
+        if args.target_points and len(series) > args.target_points:
+            picked = lttb_indices(series["ts"].astype("int64").to_numpy(),
+                                  series["MW"].to_numpy(), args.target_points)
+            series = series.iloc[picked]
+        if args.scatter:
+            plt.scatter(series["ts"], series["MW"], s=6, alpha=0.7, label=label)
         else:
-            # Single node in data (or user chose aggregate=none) — plot raw (or resampled) series
-            series = df[["ts","MW"]]
-            series = apply_resample(series) if args.resample else series
-            if args.scatter:
-                plt.scatter(series["ts"], series["MW"], s=6, alpha=0.7)
-            else:
-                plt.plot(series["ts"], series["MW"], marker=None, linestyle="-")
-            legend_label = "Series"
+            plt.plot(series["ts"], series["MW"], marker=None, linestyle="-", label=label)
 
     # Labels & title
     plt.xlabel("Time (GMT)")
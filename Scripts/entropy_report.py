@@ -4,29 +4,85 @@ File Entropy Analyzer
 Measures and visualizes the entropy of a file across byte offsets.
 """
 
-import sys
+import heapq
 import math
-from collections import Counter
+import mmap
+import sys
 from pathlib import Path
+import matplotlib
+matplotlib.use('Agg')  # the graph is always saved to a file, never shown
 import matplotlib.pyplot as plt
 import matplotlib.patches as mpatches
 import numpy as np
 
+# Most windows whose histograms are built by a single bincount call
+HISTOGRAM_BATCH = 4096
+
+# Maximum number of points drawn for the entropy curve
+PLOT_POINTS = 4000
+
 
 def calculate_entropy(data):
     """Calculate Shannon entropy of a byte sequence."""
     if not data:
         return 0.0
     
-    counts = Counter(data)
-    total = len(data)
-    entropy = 0.0
+    counts = np.bincount(np.frombuffer(data, dtype=np.uint8), minlength=256)
+    counts = counts[counts > 0]
+    probabilities = counts / len(data)
+    # "or 0.0" turns the -0.0 of a single-symbol input into 0.0
+    return -float((probabilities * np.log2(probabilities)).sum()) or 0.0
+
+
+def window_entropies(buf, starts, window_size, step_size):
+    """
+    Calculate the Shannon entropy of every full window in a byte buffer.
+    
+    Consecutive windows overlap, so a running histogram is kept: each window's
+    counts are the previous window's, plus the step_size bytes that enter it,
+    minus the step_size bytes that leave. Within a batch of windows the entering
+    and leaving steps are histogrammed by one bincount each and accumulated with
+    cumsum, so the work per window is O(step_size + 256) whatever the window size.
     
-    for count in counts.values():
-        probability = count / total
-        entropy -= probability * math.log2(probability)
+    Args:
+        buf: uint8 array holding the file contents
+        starts: Offsets of windows that lie entirely within buf, step_size apart
+        window_size: Size of each window in bytes
+        step_size: Distance between consecutive windows in bytes
+    
+    Returns:
+        np.ndarray: Entropy of each window (float32), in the order of starts
+    """
+    entropies = np.empty(len(starts), dtype=np.float32)
+    batch_size = max(1, min(HISTOGRAM_BATCH, HISTOGRAM_BATCH * 256 // step_size))
+    
+    # Counts are integers in [0, window_size], so c * log2(c) is looked up
+    counts_range = np.arange(1, window_size + 1)
+    count_log2_count = np.zeros(window_size + 1)
+    count_log2_count[1:] = counts_range * np.log2(counts_range)
+    log2_window = math.log2(window_size)
+    
+    for i in range(0, len(starts), batch_size):
+        batch = starts[i:i + batch_size]
+        first, n_steps = batch[0], len(batch) - 1
+        step_ids = np.repeat(np.arange(n_steps), step_size)
+        
+        def step_counts(offset):
+            """Histogram of each of the n_steps steps starting at offset, one column per step."""
+            data = buf[offset:offset + n_steps * step_size].astype(np.int64)
+            return np.bincount(data * n_steps + step_ids, minlength=256 * n_steps).reshape(256, n_steps)
+        
+        # Column 0 is the first window; column w adds the changes of windows
+        # 1..w (byte values are rows, so cumsum runs along contiguous memory)
+        counts = np.empty((256, len(batch)), dtype=np.int64)
+        counts[:, 0] = np.bincount(buf[first:first + window_size], minlength=256)
+        counts[:, 1:] = step_counts(first + window_size) - step_counts(first)
+        np.cumsum(counts, axis=1, out=counts)
+        
+        # H = -sum(c/N * log2(c/N)) = log2(N) - sum(c * log2(c)) / N
+        entropies[i:i + len(batch)] = log2_window - count_log2_count[counts].sum(axis=0) / window_size
     
-    return entropy
+    return entropies
 
 
 def analyze_file_entropy(filepath, window_size=256, step_size=128):
@@ -39,27 +95,25 @@ def analyze_file_entropy(filepath, window_size=256, step_size=128):
         step_size: Number of bytes to move the window each iteration
     
     Returns:
-        tuple: (offsets, entropies, file_size)
+        tuple: (offsets, entropies, file_size), with offsets as an int64 array
+        and entropies as a float32 array
     """
-    offsets = []
-    entropies = []
-    
-    with open(filepath, 'rb') as f:
-        file_size = Path(filepath).stat().st_size
+    file_size = Path(filepath).stat().st_size
+    offsets = np.arange(0, file_size, step_size, dtype=np.int64)
+    entropies = np.empty(len(offsets), dtype=np.float32)
+    if file_size == 0:
+        return offsets, entropies, file_size
+    
+    # Windows starting this close to EOF are truncated and handled one by one
+    n_full = int(np.searchsorted(offsets, file_size - window_size, side='right'))
+    
+    with open(filepath, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        buf = np.frombuffer(mm, dtype=np.uint8)
+        entropies[:n_full] = window_entropies(buf, offsets[:n_full], window_size, step_size)
+        del buf  # release the mmap export before it is closed
         
-        position = 0
-        while position < file_size:
-            f.seek(position)
-            data = f.read(window_size)
-            
-            if not data:
-                break
-            
-            entropy = calculate_entropy(data)
-            offsets.append(position)
-            entropies.append(entropy)
-            
-            position += step_size
+        for i in range(n_full, len(offsets)):
+            entropies[i] = calculate_entropy(mm[offsets[i]:offsets[i] + window_size])
     
     return offsets, entropies, file_size
 
@@ -77,65 +131,65 @@ def find_significant_regions(offsets, entropies, file_size, threshold=1.0, min_s
         tuple: (low_entropy_regions, high_entropy_regions)
         Each region is a dict with 'start', 'end', 'avg_entropy'
     """
-    low_regions = []
-    high_regions = []
-    
-    current_low = None
-    current_high = None
+    offsets = np.asarray(offsets)
+    entropies = np.asarray(entropies, dtype=np.float64)
+    if len(entropies) == 0:
+        return [], []
+    
+    # Split the samples into runs that are all below or all above the threshold;
+    # a run ends where the next one starts, and the last one at the end of file
+    is_low = entropies < threshold
+    run_starts = np.concatenate(([0], np.flatnonzero(is_low[1:] != is_low[:-1]) + 1))
+    run_lengths = np.diff(np.append(run_starts, len(entropies)))
+    starts = offsets[run_starts]
+    ends = np.append(offsets[run_starts[1:]], file_size)
+    avg_entropies = np.add.reduceat(entropies, run_starts) / run_lengths
+    
+    # Calculate minimum span as percentage of file size or absolute minimum
+    min_span = max(min_span_bytes, file_size * 0.005)  # 0.5% of file or min_span_bytes
+    significant = (ends - starts) >= min_span
+    
+    def regions(mask):
+        return [
+            {'start': int(start), 'end': int(end), 'avg_entropy': float(avg)}
+            for start, end, avg in zip(starts[mask], ends[mask], avg_entropies[mask])
+        ]
+    
+    low_runs = is_low[run_starts]
+    return regions(significant & low_runs), regions(significant & ~low_runs)
+
+
+def lttb_indices(x, y, n_out):
+    """
+    Pick n_out points that preserve the visual shape of a series, using
+    Largest-Triangle-Three-Buckets downsampling.
     
-    for i, (offset, entropy) in enumerate(zip(offsets, entropies)):
-        # Track low entropy regions (runs of constant/repetitive data)
-        if entropy < threshold:
-            if current_low is None:
-                current_low = {'start': offset, 'entropies': [entropy]}
-            else:
-                current_low['entropies'].append(entropy)
-            
-            # Close high entropy region if one was open
-            if current_high is not None:
-                current_high['end'] = offset
-                current_high['avg_entropy'] = sum(current_high['entropies']) / len(current_high['entropies'])
-                span_size = current_high['end'] - current_high['start']
-                # Calculate minimum span as percentage of file size or absolute minimum
-                min_span = max(min_span_bytes, file_size * 0.005)  # 0.5% of file or min_span_bytes
-                if span_size >= min_span:
-                    high_regions.append(current_high)
-                current_high = None
-        else:
-            if current_high is None:
-                current_high = {'start': offset, 'entropies': [entropy]}
-            else:
-                current_high['entropies'].append(entropy)
-            
-            # Close low entropy region if one was open
-            if current_low is not None:
-                current_low['end'] = offset
-                current_low['avg_entropy'] = sum(current_low['entropies']) / len(current_low['entropies'])
-                span_size = current_low['end'] - current_low['start']
-                # Calculate minimum span as percentage of file size or absolute minimum
-                min_span = max(min_span_bytes, file_size * 0.005)  # 0.5% of file or min_span_bytes
-                if span_size >= min_span:
-                    low_regions.append(current_low)
-                current_low = None
-    
-    # Close any open regions at end of file
-    if current_low is not None:
-        current_low['end'] = offsets[-1]
-        current_low['avg_entropy'] = sum(current_low['entropies']) / len(current_low['entropies'])
-        span_size = current_low['end'] - current_low['start']
-        min_span = max(min_span_bytes, file_size * 0.005)
-        if span_size >= min_span:
-            low_regions.append(current_low)
-    
-    if current_high is not None:
-        current_high['end'] = offsets[-1]
-        current_high['avg_entropy'] = sum(current_high['entropies']) / len(current_high['entropies'])
-        span_size = current_high['end'] - current_high['start']
-        min_span = max(min_span_bytes, file_size * 0.005)
-        if span_size >= min_span:
-            high_regions.append(current_high)
-    
-    return low_regions, high_regions
+    Returns:
+        np.ndarray: Sorted indices into x and y (all of them if n_out >= len(x))
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    
+    # First and last points are always kept; the rest is split into n_out - 2 buckets
+    edges = np.append(np.linspace(1, n - 1, n_out - 1).astype(np.int64), n)
+    picked = np.empty(n_out, dtype=np.int64)
+    picked[0], picked[-1] = 0, n - 1
+    
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        # Keep the point forming the largest triangle with the previous pick
+        # and the average of the next bucket
+        avg_x = x[hi:edges[i + 2]].mean()
+        avg_y = y[hi:edges[i + 2]].mean()
+        area = np.abs((x[a] - avg_x) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (avg_y - y[a]))
+        a = lo + int(area.argmax())
+        picked[i + 1] = a
+    
+    return picked
 
 
 def format_bytes(num_bytes):
@@ -151,8 +205,9 @@ def plot_entropy(filepath, offsets, entropies, file_size, low_regions, high_regi
     """Create and save the entropy visualization."""
     fig, ax = plt.subplots(figsize=(14, 8))
     
-    # Plot main entropy curve
-    ax.plot(offsets, entropies, linewidth=0.8, color='steelblue', alpha=0.8)
+    # Plot main entropy curve, downsampled to keep PDF/SVG output small
+    picked = lttb_indices(offsets, entropies, PLOT_POINTS)
+    ax.plot(offsets[picked], entropies[picked], linewidth=0.8, color='steelblue', alpha=0.8)
     
     # Function to create smart labels with width info
     def create_label(region, color_name):
@@ -167,7 +222,12 @@ def plot_entropy(filepath, offsets, entropies, file_size, low_regions, high_regi
     
     # Function to determine if labels would overlap
     def calculate_label_positions(regions, base_y):
-        """Calculate non-overlapping y positions for labels."""
+        """
+        Calculate non-overlapping y positions for labels.
+        
+        Sweeps the regions by start position and puts each label in the lowest
+        row whose previous label ends at least min_spacing before it.
+        """
         if not regions:
             return []
         
@@ -179,22 +239,24 @@ def plot_entropy(filepath, offsets, entropies, file_size, low_regions, high_regi
         plot_range = file_size
         min_spacing = plot_range * 0.08  # Minimum horizontal spacing
         
-        current_row = 0
-        last_end = -float('inf')
+        busy_rows = []  # heap of (position where the row frees up, row)
+        free_rows = []  # heap of rows that can take the next label
+        row_count = 0
         
         for region in sorted_regions:
-            region_center = (region['start'] + region['end']) / 2
+            while busy_rows and busy_rows[0][0] <= region['start']:
+                heapq.heappush(free_rows, heapq.heappop(busy_rows)[1])
             
-            # Check if this region overlaps with previous in current row
-            if region['start'] - last_end < min_spacing:
-                current_row += 1
+            if free_rows:
+                row = heapq.heappop(free_rows)
             else:
-                current_row = 0
+                row = row_count
+                row_count += 1
+            heapq.heappush(busy_rows, (region['end'] + min_spacing, row))
             
             # Calculate y position with vertical offset for each row
-            y_pos = base_y + (current_row * 0.8)  # Stack labels vertically
+            y_pos = base_y + (row * 0.8)  # Stack labels vertically
             positions.append({'region': region, 'y': y_pos})
-            last_end = region['end']
         
         return positions
     
@@ -253,9 +315,9 @@ def plot_entropy(filepath, offsets, entropies, file_size, low_regions, high_regi
     ax.xaxis.set_major_formatter(FuncFormatter(hex_formatter))
     
     # Add statistics box
-    avg_entropy = sum(entropies) / len(entropies)
-    max_entropy = max(entropies)
-    min_entropy = min(entropies)
+    avg_entropy = entropies.mean()
+    max_entropy = entropies.max()
+    min_entropy = entropies.min()
     
     stats_text = (
         f"File Size: {format_bytes(file_size)} ({file_size:,} bytes)\n"
@@ -306,7 +368,7 @@ def main():
     low_regions, high_regions = find_significant_regions(offsets, entropies, file_size)
     
     print(f"File size: {format_bytes(file_size)}")
-    print(f"Average entropy: {sum(entropies)/len(entropies):.3f} bits")
+    print(f"Average entropy: {entropies.mean():.3f} bits")
     print(f"Found {len(low_regions)} low entropy regions")
     print(f"Found {len(high_regions)} high entropy regions\n")
     
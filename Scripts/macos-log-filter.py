@@ -8,63 +8,66 @@ import argparse
 import sys
 import signal
 from datetime import datetime
-from typing import List, Tuple, Optional
+from typing import BinaryIO, Collection, Dict, Iterable, Iterator, List, Tuple, Optional
 
 # Handle broken pipe errors gracefully (e.g., when piping to head)
 # SIGPIPE is not available on Windows
 if hasattr(signal, 'SIGPIPE'):
     signal.signal(signal.SIGPIPE, signal.SIG_DFL)
 
+# Timestamp at the start of a main log line: 2025-12-03 15:23:25.803042-0800
+TIMESTAMP_RE = re.compile(rb'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+[+-]\d{4})')
+
+# Timestamp plus the process name, which comes before the first colon after
+# the TTL field: timestamp thread type activity pid ttl process_name: ...
+MAIN_LINE_RE = re.compile(TIMESTAMP_RE.pattern + rb'(?:\S*(?:\s+\S+){5}\s+([^:\s][^:]*):)?')
+
+# Log files are read in blocks of this size and split into lines
+READ_BLOCK_SIZE = 1 << 20
+
 
 class LogEntry:
-    """Represents a single log entry, potentially with multiple lines."""
+    """Represents a single log entry, potentially with multiple lines.
 
-    def __init__(self, main_line: str, continuation_lines: List[str] = None):
+    Lines are kept as raw bytes; only the process name is decoded.
+    """
+
+    # No per-instance __dict__: logs can hold millions of entries
+    __slots__ = ('main_line', 'continuation_lines', 'timestamp_raw', 'process_name')
+
+    def __init__(self, main_line: bytes, continuation_lines: List[bytes] = None):
         self.main_line = main_line
         self.continuation_lines = continuation_lines or []
         self._parse_main_line()
 
     def _parse_main_line(self):
         """Parse the main log line to extract timestamp and process name."""
-        # Timestamp pattern: 2025-12-03 15:23:25.803042-0800
-        timestamp_pattern = r'^(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+[+-]\d{4})'
-
-        match = re.match(timestamp_pattern, self.main_line)
-        if match:
-            timestamp_str = match.group(1)
-            # Parse the timestamp
-            # Format: YYYY-MM-DD HH:MM:SS.ffffff-HHMM
-            try:
-                self.timestamp = datetime.strptime(timestamp_str[:-5], '%Y-%m-%d %H:%M:%S.%f')
-            except ValueError:
-                self.timestamp = None
-        else:
-            self.timestamp = None
-
-        # Extract process name (comes before the first colon after the TTL field)
-        # Split on whitespace and find the field before the first colon
-        # Format: timestamp thread type activity pid ttl process_name: ...
-        parts = self.main_line.split(None, 7)  # Split on whitespace, max 8 parts
-        if len(parts) >= 8:
-            # The 8th part contains "process_name: rest of line"
-            remainder = parts[7]
-            colon_pos = remainder.find(':')
-            if colon_pos > 0:
-                self.process_name = remainder[:colon_pos].strip()
-            else:
-                self.process_name = None
-        else:
+        match = MAIN_LINE_RE.match(self.main_line)
+        if not match:
+            self.timestamp_raw = None
             self.process_name = None
+            return
+
+        # Format: YYYY-MM-DD HH:MM:SS.ffffff-HHMM (the UTC offset is dropped);
+        # it is compared as text, so no datetime is built
+        self.timestamp_raw = match.group(1)[:-5]
+
+        process_name = match.group(2)
+        self.process_name = process_name.rstrip().decode('utf-8', 'replace') if process_name else None
+
+    def matches_filter(self, start_key: Optional[bytes] = None,
+                       end_key: Optional[bytes] = None,
+                       processes: Optional[Collection[str]] = None) -> bool:
+        """Check if this log entry matches the filter criteria (to be REMOVED).
 
-    def matches_filter(self, start_time: Optional[datetime] = None,
-                       end_time: Optional[datetime] = None,
-                       processes: Optional[List[str]] = None) -> bool:
-        """Check if this log entry matches the filter criteria (to be REMOVED)."""
+        start_key/end_key are times formatted with timestamp_key(); zero-padded
+        timestamps sort the same as text and as times, so no datetime is built.
+        """
         # Check timestamp range
-        if self.timestamp:
-            if start_time and self.timestamp < start_time:
+        if self.timestamp_raw:
+            if start_key and self.timestamp_raw < start_key:
                 return False
-            if end_time and self.timestamp > end_time:
+            if end_key and self.timestamp_raw > end_key:
                 return False
 
         # Check process name
@@ -74,32 +77,44 @@ class LogEntry:
 
         return True
 
-    def to_string(self) -> str:
-        """Convert the log entry back to string format."""
-        lines = [self.main_line]
-        lines.extend(self.continuation_lines)
-        return '\n'.join(lines)
+    def to_bytes(self) -> bytes:
+        """Convert the log entry back to its original lines."""
+        if not self.continuation_lines:
+            return self.main_line
+        return b'\n'.join([self.main_line, *self.continuation_lines])
 
 
-def is_main_log_line(line: str) -> bool:
+def timestamp_key(time: datetime) -> bytes:
+    """Format a datetime like LogEntry.timestamp_raw, for string comparison."""
+    return time.strftime('%Y-%m-%d %H:%M:%S.%f').encode()
+
+
+def read_lines(f: BinaryIO) -> Iterator[bytes]:
+    """Yield the lines of a binary file without their newlines, reading in blocks."""
+    tail = b''
+    while block := f.read(READ_BLOCK_SIZE):
+        lines = (tail + block).split(b'\n')
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def is_main_log_line(line: bytes) -> bool:
     """Check if a line is a main log line (starts with timestamp)."""
-    timestamp_pattern = r'^\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}\.\d+[+-]\d{4}'
-    return bool(re.match(timestamp_pattern, line))
+    return TIMESTAMP_RE.match(line) is not None
 
 
-def parse_log_file(file_path: str, quiet: bool = True) -> List[LogEntry]:
-    """Parse a log file into LogEntry objects."""
-    entries = []
+def parse_log_file(file_path: str, quiet: bool = True) -> Iterator[LogEntry]:
+    """Parse a log file, yielding LogEntry objects as they are completed."""
     current_entry = None
 
-    with open(file_path, 'r', encoding='utf-8', errors='replace') as f:
-        for line in f:
-            line = line.rstrip('\n')
-
+    with open(file_path, 'rb') as f:
+        for line in read_lines(f):
             if is_main_log_line(line):
-                # Save previous entry if exists
+                # Emit previous entry if exists
                 if current_entry:
-                    entries.append(current_entry)
+                    yield current_entry
 
                 # Start new entry
                 current_entry = LogEntry(line)
@@ -111,17 +126,27 @@ def parse_log_file(file_path: str, quiet: bool = True) -> List[LogEntry]:
 
         # Don't forget the last entry
         if current_entry:
-            entries.append(current_entry)
-
-    return entries
+            yield current_entry
 
 
-def filter_entries(entries: List[LogEntry],
+def filter_entries(entries: Iterable[LogEntry],
                    start_time: Optional[datetime] = None,
                    end_time: Optional[datetime] = None,
-                   processes: Optional[List[str]] = None) -> List[LogEntry]:
-    """Filter log entries - REMOVES entries that match the criteria."""
-    return [entry for entry in entries if not entry.matches_filter(start_time, end_time, processes)]
+                   processes: Optional[Collection[str]] = None,
+                   removed_counts: Optional[Dict[Optional[str], int]] = None) -> Iterator[LogEntry]:
+    """Filter log entries - REMOVES entries that match the criteria.
+
+    If removed_counts is given, it is updated with the number of removed
+    entries per process name as the entries are consumed.
+    """
+    start_key = timestamp_key(start_time) if start_time else None
+    end_key = timestamp_key(end_time) if end_time else None
+
+    for entry in entries:
+        if not entry.matches_filter(start_key, end_key, processes):
+            yield entry
+        elif removed_counts is not None:
+            removed_counts[entry.process_name] = removed_counts.get(entry.process_name, 0) + 1
 
 
 def parse_datetime(date_str: str) -> datetime:
@@ -177,6 +202,9 @@ Examples:
 
     args = parser.parse_args()
 
+    # Process names are looked up once per entry; a set makes that O(1)
+    processes = frozenset(args.processes) if args.processes else None
+
     # Quiet by default, verbose if requested
     quiet = not args.verbose
 
@@ -200,46 +228,29 @@ Examples:
     if not quiet:
         print(f"Parsing log file: {args.input_file}", file=sys.stderr)
     entries = parse_log_file(args.input_file, quiet=quiet)
-    if not quiet:
-        print(f"Found {len(entries)} log entries", file=sys.stderr)
-
-    # Apply filters (removes matching entries)
-    filtered_entries = filter_entries(entries, start_time, end_time, args.processes)
-    if not quiet:
-        print(f"After filtering: {len(filtered_entries)} entries remaining", file=sys.stderr)
-        print(f"Removed: {len(entries) - len(filtered_entries)} entries", file=sys.stderr)
-
-    # Show statistics if requested
-    if args.stats:
-        print("\n=== Statistics ===", file=sys.stderr)
-        print(f"Total entries: {len(entries)}", file=sys.stderr)
-        print(f"Removed entries: {len(entries) - len(filtered_entries)}", file=sys.stderr)
-        print(f"Remaining entries: {len(filtered_entries)}", file=sys.stderr)
-
-        # Count removed by process
-        removed_entries = [e for e in entries if e not in filtered_entries]
-        process_counts = {}
-        for entry in removed_entries:
-            if entry.process_name:
-                process_counts[entry.process_name] = process_counts.get(entry.process_name, 0) + 1
 
-        if process_counts:
-            print("\nRemoved entries by process:", file=sys.stderr)
-            for process, count in sorted(process_counts.items(), key=lambda x: x[1], reverse=True):
-                print(f"  {process}: {count}", file=sys.stderr)
-        print(file=sys.stderr)
+    # Apply filters (removes matching entries); entries are streamed through,
+    # so counts are collected along the way and reported once output is done
+    process_counts = {}
+    filtered_entries = filter_entries(entries, start_time, end_time, processes,
+                                      removed_counts=process_counts)
+    remaining = 0
 
     # Output results
     try:
         if args.output_file:
-            with open(args.output_file, 'w', encoding='utf-8') as f:
+            with open(args.output_file, 'wb') as f:
                 for entry in filtered_entries:
-                    f.write(entry.to_string() + '\n')
+                    f.write(entry.to_bytes() + b'\n')
+                    remaining += 1
             if not quiet:
                 print(f"Output written to: {args.output_file}", file=sys.stderr)
         else:
+            out = sys.stdout.buffer
             for entry in filtered_entries:
-                print(entry.to_string())
+                out.write(entry.to_bytes() + b'\n')
+                remaining += 1
+            out.flush()
     except BrokenPipeError:
         # Python flushes standard streams on exit; redirect remaining output
         # to devnull to avoid another BrokenPipeError at shutdown
@@ -247,6 +258,26 @@ Examples:
         sys.stdout = devnull
         sys.exit(0)
 
+    removed = sum(process_counts.values())
+    if not quiet:
+        print(f"Found {remaining + removed} log entries", file=sys.stderr)
+        print(f"After filtering: {remaining} entries remaining", file=sys.stderr)
+        print(f"Removed: {removed} entries", file=sys.stderr)
+
+    # Show statistics if requested
+    if args.stats:
+        print("\n=== Statistics ===", file=sys.stderr)
+        print(f"Total entries: {remaining + removed}", file=sys.stderr)
+        print(f"Removed entries: {removed}", file=sys.stderr)
+        print(f"Remaining entries: {remaining}", file=sys.stderr)
+
+        # Count removed by process (entries without a process name are not listed)
+        process_counts.pop(None, None)
+        if process_counts:
+            print("\nRemoved entries by process:", file=sys.stderr)
+            for process, count in sorted(process_counts.items(), key=lambda x: x[1], reverse=True):
+                print(f"  {process}: {count}", file=sys.stderr)
+        print(file=sys.stderr)
 
 if __name__ == '__main__':
     main()
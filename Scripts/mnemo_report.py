@@ -16,10 +16,16 @@ Notes:
 """
 
 import argparse
+import mmap
+import os
 import re
 import sys
 from collections import Counter
-from collections.abc import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from collections.abc import Mapping
+from operator import itemgetter
+from typing import BinaryIO
+from types import MappingProxyType
 
 
 # ---------- Known microarchitectures (up to Pentium II) ----------
@@ -38,10 +44,10 @@ UARCH: dict[str, tuple[str, str]] = {
 # These are instruction sequences recognized by disassemblers as single mnemonics
 # but are actually valid combinations of older instructions. We annotate with the
 # year/uarch when the mnemonic was introduced, but note the compatibility.
-COMBINING_MNEMONICS: dict[str, tuple[str, str, str]] = {
-    # mnemonic: (introduced_year, introduced_uarch, note)
-    "pause": ("2000", "Pentium 4", "rep nop; compat: 8086"),
-}
+COMBINING_MNEMONICS: Mapping[str, tuple[str, str]] = MappingProxyType({
+    # mnemonic: (introduced_year, "introduced_uarch (note)")
+    "pause": ("2000", "Pentium 4 (rep nop; compat: 8086)"),
+})
 
 # ---------- Mnemonic → (year, microarch name) ----------
 # This is intentionally not exhaustive; unknowns map to ('?','?').
@@ -106,12 +112,12 @@ _8086_ALIASES = {
     "setnz": UARCH["80386"],  # alias of setne
 }
 
-# Build the main instruction dictionary
-INTRO: dict[str, tuple[str, str]] = (
-    {m: UARCH["8086"] for m in _8086_MNEMONICS}
-    | {m: UARCH["8086"] for m in _8087_MNEMONICS}
-    | _8086_ALIASES
-    | {m: UARCH["80286"] for m in """
+# Mnemonic groups by the microarchitecture that introduced them
+_GROUPS: list[tuple[list[str], tuple[str, str]]] = [
+    (_8086_MNEMONICS, UARCH["8086"]),
+    (_8087_MNEMONICS, UARCH["8086"]),
+    *(([m], v) for m, v in _8086_ALIASES.items()),
+    ("""
         enter leave bound arpl
         ins outs insb insw outsb outsw
         pusha popa
@@ -119,8 +125,8 @@ INTRO: dict[str, tuple[str, str]] = (
         sgdt lgdt sidt lidt
         sgdtd lgdtd sidtd lidtd
         lar lsl
-        """.split()}
-    | {m: UARCH["80386"] for m in """
+        """.split(), UARCH["80286"]),
+    ("""
         cdq cwde movsx movzx
         bsf bsr bt bts btr btc
         lss lfs lgs
@@ -132,16 +138,16 @@ INTRO: dict[str, tuple[str, str]] = (
         lodsd stosd scasd movsd cmpsd
         fucom fucomp fucompp
         clts
-        """.split()}
-    | {m: UARCH["80486"] for m in """
+        """.split(), UARCH["80386"]),
+    ("""
         bswap xadd cmpxchg invd wbinvd invlpg
         cpuid
-        """.split()}
-    | {m: UARCH["Pentium"] for m in """
+        """.split(), UARCH["80486"]),
+    ("""
         rdmsr wrmsr rdtsc
         cmpxchg8b
-        """.split()}
-    | {m: UARCH["PentiumMMX"] for m in """
+        """.split(), UARCH["Pentium"]),
+    ("""
         emms movd movq
         packsswb packssdw packuswb
         paddb paddw paddd paddsb paddsw paddusb paddusw
@@ -155,99 +161,189 @@ INTRO: dict[str, tuple[str, str]] = (
         psubb psubw psubd psubsb psubsw psubusb psubusw
         punpckhbw punpckhwd punpckhdq
         punpcklbw punpcklwd punpckldq
-        """.split()}
-    | {m: UARCH["PentiumPro"] for m in """
+        """.split(), UARCH["PentiumMMX"]),
+    ("""
         cmovo cmovno cmovz cmove cmovnz cmovne cmova cmovae cmovb cmovbe
         cmovg cmovge cmovl cmovle cmovp cmovpe cmovpo cmovs cmovns
         fcmovb fcmovbe fcmove fcmovnb fcmovnbe fcmovne fcmovu fcmovnu
         fcomi fucomi fcomip fucomip
         rdpmc
         ud2 ud1
-        """.split()}
-    | {m: UARCH["PentiumII"] for m in """
+        """.split(), UARCH["PentiumPro"]),
+    ("""
         sysenter sysexit
-        """.split()}
+        """.split(), UARCH["PentiumII"]),
+    # Last, so they take precedence
+    *(([m], v) for m, v in COMBINING_MNEMONICS.items()),
+]
+
+# Build the main instruction dictionary in one pass, with interned keys so
+# lookups of the (also interned) counted mnemonics compare pointers.
+# Read-only view: the table is never modified.
+INTRO: Mapping[str, tuple[str, str]] = MappingProxyType(
+    {sys.intern(m): v for mnems, v in _GROUPS for m in mnems}
 )
 
 # Prefixes that should be skipped when extracting the core instruction
-PREFIXES = {
+PREFIXES = frozenset({
     "rep", "repe", "repz", "repne", "repnz", "lock",
     "data16", "data32", "addr16", "addr32",
     "bnd",
-}
+})
 
+# objdump output is ASCII, so it is parsed as bytes without decoding each line;
+# both cases are listed so tokens can be checked without lowercasing them
+_PREFIXES_B = frozenset(c for p in PREFIXES for c in (p.encode(), p.upper().encode()))
 
-def normalize_mnemonic(tokens: list[str]) -> tuple[str | None, int]:
-    """
-    Given a token list starting at the mnemonic/prefix in a disasm line,
-    return the normalized mnemonic and how many tokens were consumed.
-    """
-    i = 0
-    # Skip any number of known prefixes
-    while i < len(tokens) and tokens[i].lower() in PREFIXES:
-        i += 1
-    if i >= len(tokens):
-        return None, i
-
-    m = tokens[i].lower().rstrip(",")
-    return m, i + 1
-
-
-# Regex to catch typical objdump lines
-LINE_RE = re.compile(
-    r"""^\s*
-        [0-9a-fA-F]+:         # address
-        \s+
-        (?:[0-9a-fA-F]{2}\s+)+ # bytes (one or more)
-        (?P<rest>.*?)$         # the rest (mnemonic and operands)
-    """,
-    re.VERBOSE,
+# Standard input is read and scanned in blocks of this size
+READ_BLOCK_SIZE = 1 << 20
+
+# Files larger than this are split into chunks parsed by separate processes
+PARALLEL_MIN_SIZE = 16 << 20
+
+
+def _nocase(word: bytes) -> bytes:
+    """Case-insensitive pattern for an ASCII word (faster than a (?i:...) group)."""
+    return b"".join(
+        b"[%c%c]" % (c, c - 32) if 0x61 <= c <= 0x7A else re.escape(bytes([c]))
+        for c in word
+    )
+
+
+# An objdump instruction line: address and TAB, the instruction bytes and TAB,
+# then any number of prefixes before the mnemonic, which is captured as the
+# first token that is not a prefix (match() anchors it at the line start).
+# Whitespace classes exclude the newline so a match never spans two lines.
+_PREFIX_ALT = b"|".join(_nocase(p.encode()) for p in sorted(PREFIXES, key=len, reverse=True))
+_INSN_LINE = (
+    rb"[ \t\r\f\v]*[0-9a-fA-F]+:\t[^\t\n]*\t[ \t\r\f\v]*"
+    rb"(?:(?:" + _PREFIX_ALT + rb")[ \t\r\f\v]+)*(\S+)"
 )
+LINE_RE = re.compile(_INSN_LINE)
+
+# The same, searched for across a whole buffer: matching from the newline
+# before each line lets the regex engine skip ahead with a fast literal scan
+# (a multiline "^" is tried at every byte)
+BUFFER_RE = re.compile(b"\n" + _INSN_LINE)
+
+
+def _count_tokens(buf: bytes | mmap.mmap, start: int, end: int) -> Counter[bytes]:
+    """Count the raw mnemonic tokens in buf[start:end]; start must begin a line."""
+    # BUFFER_RE matches from the newline ending the previous line; the first
+    # line of the buffer has none, so it is matched on its own. Lines holding
+    # only the continued bytes of a long instruction have no mnemonic column
+    # and don't match.
+    raw = Counter(map(itemgetter(1), BUFFER_RE.finditer(buf, max(start - 1, 0), end)))
+    if start == 0 and (m := LINE_RE.match(buf, 0, end)):
+        raw[m[1]] += 1
+    return raw
+
+
+def _normalize_counts(raw: Mapping[bytes, int]) -> dict[str, int]:
+    """Turn counts of raw mnemonic tokens into counts of normalized mnemonics."""
+    # Only the distinct tokens are normalized, decoded and interned; they are
+    # merged in a plain dict, as Counter's item access runs Python code
+    counts: dict[str, int] = {}
+    counts_get = counts.get
+    for token, count in raw.items():
+        # A line of nothing but prefixes leaves the last one captured
+        if token in _PREFIXES_B:
+            continue
+
+        mnemonic = token.rstrip(b",")
+        if not mnemonic:
+            continue
+
+        # Filter out artifacts: ".byte", ".string" etc. (when -D used)
+        if mnemonic[0] == 0x2E:  # "."
+            continue
+
+        # Remove trailing ':' in cases where objdump prints pseudo-label tokens
+        mnemonic = mnemonic.rstrip(b":").lower()
+        mnemonic = sys.intern(mnemonic.decode("utf-8", "ignore"))
+        counts[mnemonic] = counts_get(mnemonic, 0) + count
+    return counts
 
 
-def parse_stream(iter_lines: Iterable[str]) -> Counter[str]:
-    """Parse objdump output and count instruction mnemonics."""
-    counts: Counter[str] = Counter()
-    for line in iter_lines:
-        if m := LINE_RE.match(line):
-            rest = m.group("rest").strip()
-            if not rest:
-                continue
+def parse_stream(f: BinaryIO) -> dict[str, int]:
+    """Count instruction mnemonics in objdump output read from a binary stream.
 
-            # Tokenize by whitespace; first tokens may include prefixes
-            tokens = rest.split()
-            if not tokens:
-                continue
+    The stream is read in blocks, each scanned up to its last complete line.
+    """
+    raw: Counter[bytes] = Counter()
+    tail = b""
+    while block := f.read(READ_BLOCK_SIZE):
+        buf = tail + block
+        cut = buf.rfind(b"\n") + 1
+        raw.update(_count_tokens(buf, 0, cut))
+        tail = buf[cut:]
+    if tail:
+        raw.update(_count_tokens(tail, 0, len(tail)))
+    return _normalize_counts(raw)
+
+
+def parse_bytes(buf: bytes | mmap.mmap, start: int = 0, end: int | None = None) -> dict[str, int]:
+    """Count instruction mnemonics in buf[start:end] of objdump output.
+
+    start must be 0 or the start of a line; a line running past end is not counted.
+    """
+    if end is None or end >= len(buf):
+        end = len(buf)
+    else:
+        # Stop after the last complete line before end
+        end = max(buf.rfind(b"\n", start, end) + 1, start)
 
-            mnemonic, _ = normalize_mnemonic(tokens)
-            if not mnemonic:
-                continue
+    # One finditer over the buffer: no per-line Python dispatch
+    return _normalize_counts(_count_tokens(buf, start, end))
 
-            # Filter out artifacts: ".byte", ".string" etc. (when -D used)
-            if mnemonic.startswith("."):
-                continue
 
-            # Remove trailing ':' in cases where objdump prints pseudo-label tokens
-            mnemonic = mnemonic.rstrip(":")
+def _parse_range(path: str, start: int, end: int) -> dict[str, int]:
+    """Count the mnemonics in bytes [start, end) of a file (worker process)."""
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return parse_bytes(mm, start, end)
 
-            counts[mnemonic] += 1
-    return counts
+
+def parse_file(path: str) -> dict[str, int]:
+    """Count the mnemonics in an objdump output file.
+
+    The file is memory-mapped and scanned as a single buffer. Large files are
+    split at line boundaries into one chunk per CPU, and the chunks are
+    parsed in parallel.
+    """
+    size = os.path.getsize(path)
+    if size == 0:
+        # mmap can't map an empty file
+        return {}
+
+    workers = os.cpu_count() or 1
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if size < PARALLEL_MIN_SIZE or workers < 2:
+            return parse_bytes(mm)
+
+        # Move each chunk boundary to the start of the next line
+        bounds = [0]
+        for i in range(1, workers):
+            newline = mm.find(b"\n", max(size * i // workers, bounds[-1]))
+            bounds.append(size if newline < 0 else newline + 1)
+        bounds.append(size)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(_parse_range, [path] * workers, bounds[:-1], bounds[1:])
+        counts: dict[str, int] = {}
+        counts_get = counts.get
+        for result in results:
+            for mnemonic, count in result.items():
+                counts[mnemonic] = counts_get(mnemonic, 0) + count
+        return counts
 
 
 def lookup_intro(mnemonic: str) -> tuple[str, str]:
     """Look up the introduction year and microarchitecture for a mnemonic.
 
+    The mnemonic must already be lowercase (as produced by parse_stream).
     Returns (year, microarch) or (year, microarch_with_note) for combining mnemonics.
     """
-    m = mnemonic.lower()
-
-    # Check if it's a combining mnemonic first
-    if m in COMBINING_MNEMONICS:
-        year, uarch, note = COMBINING_MNEMONICS[m]
-        return (year, f"{uarch} ({note})")
-
-    # Otherwise look up in standard table
-    return INTRO.get(m, ("?", "?"))
+    return INTRO.get(mnemonic, ("?", "?"))
 
 
 def main() -> None:
@@ -265,35 +361,40 @@ def main() -> None:
     args = ap.parse_args()
 
     if args.file:
-        with open(args.file, encoding="utf-8", errors="ignore") as f:
-            counts = parse_stream(f)
+        counts = parse_file(args.file)
     else:
-        counts = parse_stream(sys.stdin)
+        counts = parse_stream(sys.stdin.buffer)
 
     if not counts:
         print("No instructions found.")
         return
 
-    rows = []
+    # Column widths, from a pass over the counts so no row list is needed
+    w_m, w_c, w_y, w_a = len("mnemonic"), len("count"), len("year"), len("uarch")
     for mnem, cnt in counts.items():
         year, arch = lookup_intro(mnem)
-        rows.append((mnem, cnt, year, arch))
+        w_m = max(w_m, len(mnem))
+        w_c = max(w_c, len(str(cnt)))
+        w_y = max(w_y, len(year))
+        w_a = max(w_a, len(arch))
 
+    # Rows are streamed as they are printed, looking up year and uarch on the
+    # fly, except when sorting by year, which needs them up front
     if args.sort == "mnemonic":
-        rows.sort(key=lambda r: r[0])  # alphabetical
+        items = sorted(counts.items())  # alphabetical
+        rows = ((mnem, cnt, *lookup_intro(mnem)) for mnem, cnt in items)
     elif args.sort == "count":
-        rows.sort(key=lambda r: (r[1], r[0]))  # by count, then mnemonic
+        items = sorted(counts.items(), key=itemgetter(1, 0))  # by count, then mnemonic
+        rows = ((mnem, cnt, *lookup_intro(mnem)) for mnem, cnt in items)
     elif args.sort == "year":
-        rows.sort(key=lambda r: (r[2], r[0]))  # by year, then mnemonic
+        rows = sorted(
+            ((mnem, cnt, *lookup_intro(mnem)) for mnem, cnt in counts.items()),
+            key=itemgetter(2, 0),  # by year, then mnemonic
+        )
     else:
         raise ValueError(f"unknown column '{args.sort}'")
 
     # Pretty print as columns
-    w_m = max(len("mnemonic"), max((len(r[0]) for r in rows), default=8))
-    w_c = max(len("count"), max((len(str(r[1])) for r in rows), default=5))
-    w_y = max(len("year"), max((len(r[2]) for r in rows), default=4))
-    w_a = max(len("uarch"), max((len(r[3]) for r in rows), default=6))
-
     header = (
         f"{'mnemonic'.ljust(w_m)}  {'count'.rjust(w_c)}  "
         f"{'year'.ljust(w_y)}  {'uarch'.ljust(w_a)}"